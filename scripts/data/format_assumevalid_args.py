@@ -32,6 +32,19 @@ def generate_assumevalid_args(block_data_path, proof_path=None):
     # Convert block data to Cairo serde format
     result = format_args_to_cairo_serde(block_data_path)
 
+    return append_proof_args(result, proof_path)
+
+
+def append_proof_args(result, proof_path=None):
+    """Append the optional proof to already formatted block data arguments.
+
+    Args:
+        result (list): Block data in Cairo serde format, extended in place
+        proof_path (str, optional): Path to the proof file
+
+    Returns:
+        list: List of hex values representing the assumevalid arguments
+    """
     # Append proof indicator and proof data if available
     if proof_path:
         result.append("0x0")  # Proof exists
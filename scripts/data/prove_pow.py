@@ -1,79 +1,118 @@
 #!/usr/bin/env python3
 
-import json
+import asyncio
+import mmap
 import re
 import os
+import shutil
 import argparse
 import subprocess
+import tempfile
 import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from generate_data import generate_data
-from format_args import format_args
-from format_assumevalid_args import generate_assumevalid_args
-from logging.handlers import TimedRotatingFileHandler
+from format_args import format_args_to_cairo_serde
+from format_assumevalid_args import append_proof_args
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 import traceback
 import colorlog
+import orjson
 from dataclasses import dataclass
 from typing import Optional
 import datetime
 
 logger = logging.getLogger(__name__)
 
-TMP_DIR = Path(".tmp")
+# Scratch space for prover intermediates, RAM-backed by default. The batch
+# directory is used instead when it has less than SCRATCH_MIN_FREE bytes free
+TMP_DIR = Path(os.environ.get("RAITO_TMPFS", "/dev/shm/raito"))
+SCRATCH_MIN_FREE = 4 * 1024**3
+# Batch subdirectory receiving the intermediates of a failed attempt
+INTERMEDIATES_DIR = "intermediates"
 PROOF_DIR = Path(".proofs")
+LAST_HEIGHT_FILE = PROOF_DIR / ".last_height"
+# Interval in seconds between samples of the prover steps memory usage
+MEMORY_POLL_INTERVAL = 0.1
+BATCH_DIR_PATTERN = re.compile(r"light_\d+_to_(\d+)")
+PRIV_PATH_PATTERNS = {
+    key: re.compile(rb'"%s"\s*:\s*("(?:[^"\\]|\\.)*")' % key.encode())
+    for key in ("trace_path", "memory_path")
+}
+
+# Constant parts of the prover step commands, the per-batch paths go in between
+PIE_CMD_PREFIX = ("cairo-execute", "--layout", "all_cairo_stwo", "--args-file")
+PIE_CMD_OUTPUT = ("--prebuilt", "--output-path")
+BOOTLOAD_CMD_PREFIX = ("stwo-bootloader", "--pie")
+PROVE_CMD_PREFIX = ("adapted_stwo", "--priv_json")
+PROVE_CMD_PARAMS = (
+    "--params_json",
+    "../../packages/assumevalid/prover_params.json",
+    "--proof_path",
+)
+PROVE_CMD_SUFFIX = ("--proof-format", "cairo-serde", "--verify")
 
 
 @dataclass
 class StepInfo:
     step: str
-    stdout: str
-    stderr: str
+    log_file: Path
     returncode: int
     elapsed: float
     max_memory: Optional[int]
 
 
-def setup_logging(verbose=False, log_filename="proving.log"):
+def setup_logging(verbose=False, log_filename="proving.log", log_queue=None):
     """
     Set up logging configuration with both file and console handlers.
 
     Args:
         verbose (bool): If True, set DEBUG level; otherwise INFO level
         log_filename (str): Name of the log file
+        log_queue (multiprocessing.Queue): If set, send records to this queue
+            instead of installing the file and console handlers
     """
-    # File handler setup
-    file_handler = TimedRotatingFileHandler(
-        filename=log_filename,
-        when="midnight",
-        interval=1,
-        backupCount=14,
-        encoding="utf8",
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(
-        logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    )
+    # Root logger setup
+    root_logger = logging.getLogger()
+    if log_queue is not None:
+        # Worker process: drop the handlers inherited on fork and forward the
+        # records to the main process, which is the only one writing the log file
+        root_logger.handlers.clear()
+        root_logger.addHandler(QueueHandler(log_queue))
+    else:
+        # File handler setup
+        file_handler = TimedRotatingFileHandler(
+            filename=log_filename,
+            when="midnight",
+            interval=1,
+            backupCount=14,
+            encoding="utf8",
+        )
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        )
 
-    # Console handler with colors
-    console_handler = colorlog.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
-    console_handler.setFormatter(
-        colorlog.ColoredFormatter(
-            "%(asctime)s - %(log_color)s%(levelname)s%(reset)s - %(message)s",
-            log_colors={
-                "DEBUG": "cyan",
-                "INFO": "green",
-                "WARNING": "yellow",
-                "ERROR": "red",
-                "CRITICAL": "red,bg_white",
-            },
+        # Console handler with colors
+        console_handler = colorlog.StreamHandler()
+        console_handler.setLevel(logging.DEBUG)
+        console_handler.setFormatter(
+            colorlog.ColoredFormatter(
+                "%(asctime)s - %(log_color)s%(levelname)s%(reset)s - %(message)s",
+                log_colors={
+                    "DEBUG": "cyan",
+                    "INFO": "green",
+                    "WARNING": "yellow",
+                    "ERROR": "red",
+                    "CRITICAL": "red,bg_white",
+                },
+            )
         )
-    )
 
-    # Root logger setup
-    root_logger = logging.getLogger()
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+        root_logger.addHandler(console_handler)
+        root_logger.addHandler(file_handler)
 
     # Set log level based on verbose flag
     if verbose:
@@ -86,221 +125,351 @@ def setup_logging(verbose=False, log_filename="proving.log"):
     logging.getLogger("generate_data").setLevel(logging.WARNING)
 
 
-def run(cmd, timeout=None):
-    """Run a subprocess and measure execution time and memory usage (Linux only, using /usr/bin/time -v)"""
+def read_peak_memory(pid):
+    """Read the peak RSS of a running process in kilobytes from /proc, None if it is not available (e.g. the process has already exited)."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+async def run_async(cmd, log, timeout=None):
+    """
+    Run a subprocess asynchronously, streaming its output to the log file, and
+    measure execution time and memory usage (Linux only).
+
+    The peak memory is the VmHWM of the process, sampled every
+    MEMORY_POLL_INTERVAL seconds, so growth in the last interval before exit
+    can be missed. Unlike the rusage of the child, it does not include the
+    memory of this process inherited before exec.
+    """
     import time
     import platform
-    import re
 
     if platform.system() != "Linux":
         raise RuntimeError(
             "This script only supports Linux for timing and memory measurement."
         )
-    # Prepend /usr/bin/time -v to the command
-    time_cmd = ["/usr/bin/time", "-v"] + cmd
-    start_time = time.time()
-    try:
-        result = subprocess.run(
-            time_cmd, capture_output=True, text=True, check=False, timeout=timeout
-        )
-        elapsed = time.time() - start_time
-        # /usr/bin/time -v outputs memory usage to stderr
-        max_mem_match = re.search(
-            r"Maximum resident set size \(kbytes\): (\d+)", result.stderr
+    start_time = time.monotonic()
+    max_memory = None
+    timed_out = False
+    with subprocess.Popen(cmd, stdout=log, stderr=log) as proc:
+        # Wait for the exit without reaping the process, so that its pid cannot
+        # be reused while its memory usage is being sampled
+        exited = asyncio.ensure_future(
+            asyncio.to_thread(os.waitid, os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
         )
-        max_memory = int(max_mem_match.group(1)) if max_mem_match else None
-        # Remove the /
-        # Split stderr into time output and actual stderr
-        time_lines = []
-        actual_stderr = []
-        for line in result.stderr.splitlines():
-            if (
-                line.startswith("\t")
-                or "Maximum resident set size" in line
-                or "Command being timed" in line
-                or "User time" in line
-                or "System time" in line
-                or "Percent of CPU" in line
-                or "Elapsed (wall clock) time" in line
-                or "Average" in line
-                or "Exit status" in line
-            ):
-                time_lines.append(line)
-            else:
-                actual_stderr.append(line)
-        cleaned_stderr = "\n".join(actual_stderr)
-        return result.stdout, cleaned_stderr, result.returncode, elapsed, max_memory
-    except subprocess.TimeoutExpired as e:
-        elapsed = time.time() - start_time
-        return "", f"Process timed out after {timeout} seconds", -1, elapsed, None
-
-
-def save_prover_log(
-    batch_dir, step_name, stdout, stderr, returncode, elapsed, max_memory
-):
-
+        while not exited.done():
+            peak_memory = read_peak_memory(proc.pid)
+            if peak_memory is not None:
+                max_memory = peak_memory
+            if timeout is not None and time.monotonic() - start_time > timeout:
+                proc.kill()
+                timed_out = True
+                await exited
+                break
+            await asyncio.wait({exited}, timeout=MEMORY_POLL_INTERVAL)
+
+        _, status = os.waitpid(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    elapsed = time.monotonic() - start_time
+    if timed_out:
+        log.write(f"Process timed out after {timeout} seconds\n".encode())
+        return -1, elapsed, None
+    return proc.returncode, elapsed, max_memory
+
+
+def open_prover_log(batch_dir, step_name):
+    """Create the step log file and write its header, the step output is appended to it by the subprocess itself."""
     log_file = batch_dir / f"{step_name.lower()}.log"
 
-    with open(log_file, "w", encoding="utf-8") as f:
-        f.write(f"=== {step_name} STEP LOG ===\n")
-        f.write(f"Timestamp: {datetime.datetime.now().isoformat()}\n")
-        f.write(f"Return Code: {returncode}\n")
-        f.write(f"Execution Time: {elapsed:.2f} seconds\n")
-        if max_memory is not None:
-            f.write(f"Max Memory Usage: {max_memory/1024:.1f} MB\n")
-        f.write("\n")
+    # Unbuffered, so nothing is pending when the subprocess starts writing to it
+    f = open(log_file, "wb", buffering=0)
+    header = [
+        f"=== {step_name} STEP LOG ===\n",
+        f"Timestamp: {datetime.datetime.now().isoformat()}\n",
+        "\n",
+        "=== OUTPUT ===\n",
+    ]
+    os.writev(f.fileno(), [part.encode() for part in header])
+    return f
+
 
-        if stdout:
-            f.write("=== STDOUT ===\n")
-            f.write(stdout)
-            f.write("\n")
+def save_prover_log(log, returncode, elapsed, max_memory):
 
-        if stderr:
-            f.write("=== STDERR ===\n")
-            f.write(stderr)
-            f.write("\n")
+    summary = [
+        "\n",
+        "=== SUMMARY ===\n",
+        f"Return Code: {returncode}\n",
+        f"Execution Time: {elapsed:.2f} seconds\n",
+    ]
+    if max_memory is not None:
+        summary.append(f"Max Memory Usage: {max_memory/1024:.1f} MB\n")
+    # Write the whole summary with a single syscall
+    os.writev(log.fileno(), [part.encode() for part in summary])
 
 
-def run_prover(job_info, executable, proof, arguments):
+def drop_page_cache(path):
+    """Advise the kernel that a file will not be read again, so that its cached pages can be reclaimed first."""
+    # Only a hint, a file that cannot be opened or advised is not an error
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            # DONTNEED skips dirty pages, and the files are dropped shortly
+            # after being written, so write them back first
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.debug("Failed to drop page cache for %s: %s", path, e)
+
+
+def tail_log(log_file, size=4096):
+    """Read the last `size` bytes of a step log, used to report step errors."""
+    with open(log_file, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - size, 0))
+        return f.read().decode("utf-8", errors="replace")
+
+
+async def run_prover(job_info, executable, proof, arguments):
     """
     Run the prover pipeline:
     1. Generate a pie using cairo-execute
     2. Bootload using stwo-bootloader
     3. Prove using adapted_stwo
     Returns a tuple: (steps_info, total_elapsed, max_mem)
-    steps_info is a list of dicts with keys: step, stdout, stderr, returncode, elapsed, max_memory
+    steps_info is a list of dicts with keys: step, log_file, returncode, elapsed, max_memory
     """
     # Get the batch directory from the proof file path
     batch_dir = Path(proof).parent
 
-    # Prepare intermediate file paths within the batch directory
-    pie_file = batch_dir / "pie.cairo_pie.zip"
-    priv_json = batch_dir / "priv.json"
-    pub_json = batch_dir / "pub.json"
+    # Prepare intermediate file paths within the scratch directory, only the
+    # proof and the logs are written to the batch directory
+    scratch_dir = prepare_scratch_dir(job_info, batch_dir)
+    # Drop the intermediates of an earlier failed attempt
+    shutil.rmtree(batch_dir / INTERMEDIATES_DIR, ignore_errors=True)
+    pie_file = scratch_dir / "pie.cairo_pie.zip"
+    priv_json = scratch_dir / "priv.json"
+    pub_json = scratch_dir / "pub.json"
+    # String forms used by the step commands, converted once
+    pie_path, priv_path, pub_path, scratch_path = map(
+        str, (pie_file, priv_json, pub_json, scratch_dir)
+    )
 
     total_elapsed = 0.0
     max_mem = 0
     steps_info = []
 
     # 1. Generate pie
-    pie_cmd = [
-        "cairo-execute",
-        "--layout",
-        "all_cairo_stwo",
-        "--args-file",
-        arguments,
-        "--prebuilt",
-        "--output-path",
-        str(pie_file),
-        executable,
-    ]
-    logger.debug(f"{job_info} [PIE] command:\n{' '.join(map(str, pie_cmd))}")
-    stdout, stderr, returncode, elapsed, max_memory = run(pie_cmd)
+    pie_cmd = [*PIE_CMD_PREFIX, arguments, *PIE_CMD_OUTPUT, pie_path, executable]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s [PIE] command:\n%s", job_info, " ".join(pie_cmd))
+    with open_prover_log(batch_dir, "PIE") as log:
+        returncode, elapsed, max_memory = await run_async(pie_cmd, log)
+        # Save PIE step log summary
+        save_prover_log(log, returncode, elapsed, max_memory)
     steps_info.append(
         StepInfo(
             step="PIE",
-            stdout=stdout,
-            stderr=stderr,
+            log_file=Path(log.name),
             returncode=returncode,
             elapsed=elapsed,
             max_memory=max_memory,
         )
     )
-    # Save PIE step log
-    save_prover_log(batch_dir, "PIE", stdout, stderr, returncode, elapsed, max_memory)
     if returncode != 0:
+        keep_intermediates(job_info, scratch_dir, batch_dir)
         return steps_info
 
+    # The arguments are not read again once the pie is generated
+    drop_page_cache(arguments)
+
     # 2. Bootload
-    bootload_cmd = [
-        "stwo-bootloader",
-        "--pie",
-        str(pie_file),
-        "--output-path",
-        str(batch_dir),
-    ]
-    logger.debug(f"{job_info} [BOOTLOAD] command:\n{' '.join(map(str, bootload_cmd))}")
-    stdout, stderr, returncode, elapsed, max_memory = run(bootload_cmd)
+    bootload_cmd = [*BOOTLOAD_CMD_PREFIX, pie_path, "--output-path", scratch_path]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s [BOOTLOAD] command:\n%s", job_info, " ".join(bootload_cmd))
+    with open_prover_log(batch_dir, "BOOTLOAD") as log:
+        returncode, elapsed, max_memory = await run_async(bootload_cmd, log)
+        # Save BOOTLOAD step log summary
+        save_prover_log(log, returncode, elapsed, max_memory)
     steps_info.append(
         StepInfo(
             step="BOOTLOAD",
-            stdout=stdout,
-            stderr=stderr,
+            log_file=Path(log.name),
             returncode=returncode,
             elapsed=elapsed,
             max_memory=max_memory,
         )
     )
-    # Save BOOTLOAD step log
-    save_prover_log(
-        batch_dir, "BOOTLOAD", stdout, stderr, returncode, elapsed, max_memory
-    )
     if returncode != 0:
-        logger.error(f"{job_info} [BOOTLOAD] error: {stdout or stderr}")
+        logger.error(
+            f"{job_info} [BOOTLOAD] error: {tail_log(steps_info[-1].log_file)}"
+        )
+        keep_intermediates(job_info, scratch_dir, batch_dir)
         return steps_info
 
     # 3. Prove
     prove_cmd = [
-        "adapted_stwo",
-        "--priv_json",
-        str(priv_json),
+        *PROVE_CMD_PREFIX,
+        priv_path,
         "--pub_json",
-        str(pub_json),
-        "--params_json",
-        "../../packages/assumevalid/prover_params.json",
-        "--proof_path",
-        str(proof),
-        "--proof-format",
-        "cairo-serde",
-        "--verify",
+        pub_path,
+        *PROVE_CMD_PARAMS,
+        proof,
+        *PROVE_CMD_SUFFIX,
     ]
-    logger.debug(f"{job_info} [PROVE] command:\n{' '.join(map(str, prove_cmd))}")
-    stdout, stderr, returncode, elapsed, max_memory = run(prove_cmd)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s [PROVE] command:\n%s", job_info, " ".join(prove_cmd))
+    with open_prover_log(batch_dir, "PROVE") as log:
+        returncode, elapsed, max_memory = await run_async(prove_cmd, log)
+        # Save PROVE step log summary
+        save_prover_log(log, returncode, elapsed, max_memory)
 
     steps_info.append(
         StepInfo(
             step="PROVE",
-            stdout=stdout,
-            stderr=stderr,
+            log_file=Path(log.name),
             returncode=returncode,
             elapsed=elapsed,
             max_memory=max_memory,
         )
     )
-    # Save PROVE step log (stwo prover output)
-    save_prover_log(batch_dir, "PROVE", stdout, stderr, returncode, elapsed, max_memory)
-
-    if returncode == 0:
-        temp_files = [pie_file, pub_json]
-
-        # Parse priv.json to get trace and memory file paths
-        if priv_json.exists():
-            try:
-                with open(priv_json, "r") as f:
-                    priv_data = json.load(f)
-                    if "trace_path" in priv_data:
-                        temp_files.append(Path(priv_data["trace_path"]))
-                    if "memory_path" in priv_data:
-                        temp_files.append(Path(priv_data["memory_path"]))
-                temp_files.append(
-                    priv_json
-                )  # Add priv.json itself after extracting paths
-            except Exception as e:
-                logger.warning(f"Failed to parse {priv_json} for cleanup: {e}")
-                temp_files.append(priv_json)  # Still try to clean up priv.json
-
-        for temp_file in temp_files:
-            try:
-                if temp_file.exists():
-                    temp_file.unlink()
-                    logger.debug(f"Cleaned up temporary file: {temp_file}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up {temp_file}: {e}")
+
+    if returncode != 0:
+        keep_intermediates(job_info, scratch_dir, batch_dir)
+        return steps_info
+
+    # Parse priv.json to get trace and memory file paths
+    temp_files = []
+    if priv_json.exists():
+        try:
+            temp_files.extend(map(Path, read_priv_paths(priv_json)))
+        except Exception as e:
+            logger.warning(f"Failed to parse {priv_json} for cleanup: {e}")
+
+    if scratch_dir != batch_dir:
+        # Trace and memory files are normally written to the scratch directory
+        # as well, only the ones placed elsewhere are removed one by one
+        temp_files = [f for f in temp_files if f.parent != scratch_dir]
+    else:
+        # The batch directory is kept, so remove its intermediates one by one
+        temp_files.extend((pie_file, pub_json, priv_json))
+
+    for temp_file in temp_files:
+        try:
+            temp_file.unlink()
+            logger.debug("Cleaned up temporary file: %s", temp_file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to clean up {temp_file}: {e}")
+
+    # rmtree unlinks the entries relative to the directory fd on its own
+    if scratch_dir != batch_dir:
+        try:
+            shutil.rmtree(scratch_dir)
+            logger.debug("Cleaned up scratch directory: %s", scratch_dir)
+        except Exception as e:
+            logger.warning(f"Failed to clean up {scratch_dir}: {e}")
 
     return steps_info
 
 
-def prove_batch(height, step):
+def prepare_scratch_dir(job_info, batch_dir):
+    """
+    Create a scratch directory for the batch intermediates in TMP_DIR, unique
+    to this attempt since TMP_DIR is shared by every run on the machine.
+    Falls back to the batch directory if TMP_DIR is unavailable or too small.
+    """
+    try:
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+        free = shutil.disk_usage(TMP_DIR).free
+        if free >= SCRATCH_MIN_FREE:
+            return Path(tempfile.mkdtemp(prefix=f"{batch_dir.name}-", dir=TMP_DIR))
+    except OSError as e:
+        logger.warning(
+            f"{job_info} cannot use scratch directory {TMP_DIR}: {e}, "
+            f"using {batch_dir}"
+        )
+        return batch_dir
+
+    logger.warning(
+        f"{job_info} only {free / 1024**2:.0f} MB free in {TMP_DIR}, "
+        f"using {batch_dir} for intermediate files (set RAITO_TMPFS to change)"
+    )
+    return batch_dir
+
+
+def keep_intermediates(job_info, scratch_dir, batch_dir):
+    """Move the intermediates of a failed batch next to its logs, so that they do not keep using RAM in TMP_DIR."""
+    if scratch_dir != batch_dir:
+        target = batch_dir / INTERMEDIATES_DIR
+        try:
+            shutil.move(scratch_dir, target)
+        except OSError as e:
+            logger.warning(
+                f"{job_info} failed to move intermediate files to {target}: {e}, "
+                f"kept in {scratch_dir}"
+            )
+            return
+        scratch_dir = target
+
+    logger.warning(f"{job_info} intermediate files kept in {scratch_dir}")
+
+
+def read_priv_paths(priv_json):
+    """Extract the trace and memory file paths from priv.json, without parsing the whole file unless necessary."""
+    with open(priv_json, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        matches = [pattern.search(mm) for pattern in PRIV_PATH_PATTERNS.values()]
+        if all(matches):
+            # Decode the matched JSON strings only
+            return [orjson.loads(m.group(1)) for m in matches]
+        priv_data = orjson.loads(mm[:])
+
+    return [priv_data[key] for key in PRIV_PATH_PATTERNS if key in priv_data]
+
+
+def prepare_batch(height, step, mode="light"):
+    """
+    Generate block data for a batch, store it in the batch directory and
+    format it as prover arguments.
+
+    Unlike proving, this does not depend on the previous proof, so it can run
+    ahead of the prover in a worker process.
+    Returns the block data arguments, without the previous proof.
+    """
+    batch_dir = PROOF_DIR / f"{mode}_{height}_to_{height + step}"
+    batch_dir.mkdir(parents=True, exist_ok=True)
+
+    batch_file = batch_dir / "batch.json"
+    batch_data = generate_data(
+        mode=mode, initial_height=height, num_blocks=step, fast=True
+    )
+    batch_args = {
+        "chain_state": batch_data["chain_state"],
+        "blocks": batch_data["blocks"],
+    }
+    batch_file.write_bytes(orjson.dumps(batch_args))
+    # Free the block data before it is read back and formatted
+    del batch_data, batch_args
+
+    block_args = format_args_to_cairo_serde(batch_file)
+    # The batch file is kept for reference only, it is not read again
+    drop_page_cache(batch_file)
+
+    return block_args
+
+
+async def prove_batch(height, step, batch_future):
 
     mode = "light"
     job_info = f"Job(height='{height}', blocks={step})"
@@ -322,60 +491,64 @@ def prove_batch(height, step):
                 if previous_proof_file.exists():
                     break
 
-        logger.debug(f"{job_info} generating data...")
+        logger.debug(f"{job_info} waiting for data...")
 
-        # Batch data - store in the batch directory
-        batch_file = batch_dir / "batch.json"
-        batch_data = generate_data(
-            mode=mode, initial_height=height, num_blocks=step, fast=True
-        )
-        batch_args = {
-            "chain_state": batch_data["chain_state"],
-            "blocks": batch_data["blocks"],
-        }
-        batch_file.write_text(json.dumps(batch_args, indent=2))
+        # Batch data - generated and formatted ahead of time by a worker process.
+        # Only the previous proof, which the arguments end with, has to wait for
+        # the previous batch, so PIE and BOOTLOAD cannot start any earlier.
+        block_args = await batch_future
+        # The future keeps a reference to the arguments, drop it so they can be
+        # freed below
+        del batch_future
 
         logger.debug(f"{job_info} generating args...")
 
         # Arguments file - store in the batch directory
         arguments_file = batch_dir / "arguments.json"
-        args = generate_assumevalid_args(batch_file, previous_proof_file)
-        arguments_file.write_text(json.dumps(args))
+        args = append_proof_args(block_args, previous_proof_file)
+        arguments_file.write_bytes(orjson.dumps(args))
+        # The arguments are only needed on disk from now on, free them before
+        # the prover starts
+        del block_args, args
 
         # Final proof file - store in the batch directory
         proof_file = batch_dir / "proof.json"
 
         # run prover
-        steps_info = run_prover(
+        steps_info = await run_prover(
             job_info,
             "../../target/proving/assumevalid.executable.json",
             str(proof_file),
             str(arguments_file),
         )
 
-        total_elapsed = sum(step.elapsed for step in steps_info)
-
-        max_memory_candidates = [
-            step.max_memory for step in steps_info if step.max_memory is not None
-        ]
-        max_memory = max(max_memory_candidates) if max_memory_candidates else None
+        # Single pass over the steps for both totals
+        total_elapsed = 0.0
+        max_memory = None
+        for info in steps_info:
+            total_elapsed += info.elapsed
+            if info.max_memory is not None and (
+                max_memory is None or info.max_memory > max_memory
+            ):
+                max_memory = info.max_memory
 
         last_step = steps_info[-1]
         final_return_code = last_step.returncode
         if final_return_code != 0:
-            error = last_step.stderr or last_step.stdout
+            error = tail_log(last_step.log_file)
             logger.error(f"{job_info} error:\n{error}")
             return False
         else:
-            for info in steps_info:
-                mem_usage = (
-                    f"{info.max_memory/1024:.1f} MB"
-                    if info.max_memory is not None
-                    else "N/A"
-                )
-                logger.debug(
-                    f"{job_info}, [{info.step}] time: {info.elapsed:.2f} s max memory: {mem_usage}"
-                )
+            if logger.isEnabledFor(logging.DEBUG):
+                for info in steps_info:
+                    mem_usage = (
+                        f"{info.max_memory/1024:.1f} MB"
+                        if info.max_memory is not None
+                        else "N/A"
+                    )
+                    logger.debug(
+                        f"{job_info}, [{info.step}] time: {info.elapsed:.2f} s max memory: {mem_usage}"
+                    )
             logger.info(
                 f"{job_info} done, total execution time: {total_elapsed:.2f} seconds"
                 + (
@@ -394,16 +567,36 @@ def prove_batch(height, step):
         return False
 
 
-def main(start, blocks, step):
+def init_worker(verbose, log_queue, worker_counter, worker_cpus, cpus_per_worker):
+    """
+    Initialize a prefetch worker process: forward its logs to the main process
+    and, if CPU pinning is enabled, pin it to its own slice of `worker_cpus`.
+    """
+    setup_logging(verbose, log_queue=log_queue)
+
+    if worker_cpus is None:
+        return
+
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+
+    # Wrap around in case the pool replaces a worker
+    first = index * cpus_per_worker % len(worker_cpus)
+    os.sched_setaffinity(0, worker_cpus[first : first + cpus_per_worker])
+
+
+async def main(start, blocks, step, jobs, cpus_per_worker=None):
 
     logger.info(
-        "Initial height: %d, blocks: %d, step: %d",
+        "Initial height: %d, blocks: %d, step: %d, jobs: %d",
         start,
         blocks,
         step,
+        jobs,
     )
 
-    PROOF_DIR.mkdir(exist_ok=True)
+    PROOF_DIR.mkdir(parents=True, exist_ok=True)
 
     end = start + blocks
 
@@ -412,41 +605,178 @@ def main(start, blocks, step):
     processing_step = step
 
     processed_count = 0
-    total_jobs = len(list(height_range))
+    total_jobs = len(height_range)
 
-    # Process jobs sequentially
-    for height in height_range:
-        success = prove_batch(height, processing_step)
-        if success:
-            processed_count += 1
+    # Workers log through a queue drained by a single listener, so that they
+    # do not compete for the log file
+    root_logger = logging.getLogger()
+    verbose = root_logger.isEnabledFor(logging.DEBUG)
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(
+        log_queue, *root_logger.handlers, respect_handler_level=True
+    )
+    listener.start()
+
+    # Optionally keep the prefetch workers off the CPUs the prover runs on:
+    # each worker is pinned to its own `cpus_per_worker` CPUs taken from the end
+    # of the CPU set, and the prover steps, spawned from this process, inherit
+    # the rest. Pinning is opt-in since it takes CPUs away from the prover.
+    # sched_setaffinity(0) only re-pins the calling thread, the already running
+    # listener thread keeps the full CPU set.
+    cpus = sorted(os.sched_getaffinity(0))
+    worker_cpus = None
+    if cpus_per_worker is not None:
+        if jobs * cpus_per_worker < len(cpus):
+            worker_cpus = cpus[-jobs * cpus_per_worker :]
+            os.sched_setaffinity(0, cpus[: -jobs * cpus_per_worker])
         else:
-            logger.info(f"Job at height: {height} failed, stopping further processing")
-            return
+            logger.warning(
+                "Not enough CPUs to reserve %d per worker, CPU pinning disabled",
+                cpus_per_worker,
+            )
+    worker_counter = multiprocessing.Value("i", 0)
+
+    try:
+        # Each batch consumes the proof of the previous one, so the batches form a
+        # single dependency chain and have to be proven in order. Data generation
+        # does not depend on previous proofs and is prefetched by up to `jobs`
+        # worker processes while the prover is busy.
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker,
+            initargs=(
+                verbose,
+                log_queue,
+                worker_counter,
+                worker_cpus,
+                cpus_per_worker,
+            ),
+        ) as executor:
+
+            def prefetch(height):
+                return loop.run_in_executor(
+                    executor, prepare_batch, height, processing_step
+                )
+
+            pending = deque(
+                (height, prefetch(height)) for height in height_range[:jobs]
+            )
+            upcoming = iter(height_range[jobs:])
+
+            while pending:
+                height, batch_future = pending.popleft()
+
+                # Keep the workers busy while this batch is being proven
+                next_height = next(upcoming, None)
+                if next_height is not None:
+                    pending.append((next_height, prefetch(next_height)))
+
+                # Only the prove_batch coroutine may keep the prefetched data alive
+                proving = prove_batch(height, processing_step, batch_future)
+                del batch_future
+                success = await proving
+                if success:
+                    processed_count += 1
+                    save_last_height(f"light_{height}_to_{height + processing_step}")
+                else:
+                    logger.info(
+                        f"Job at height: {height} failed, stopping further processing"
+                    )
+                    # Drop the queued prefetches, the running ones cannot be
+                    # interrupted and are still waited for when leaving the pool
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    in_flight = 0
+                    for _, future in pending:
+                        in_flight += not future.done()
+                        future.cancel()
+                    if in_flight:
+                        logger.info(
+                            "Waiting for in-flight prefetches to finish before exiting"
+                        )
+                    return
+    finally:
+        if worker_cpus is not None:
+            os.sched_setaffinity(0, cpus)
+        listener.stop()
 
     logger.info(f"All {processed_count} jobs have been processed successfully")
 
 
+def read_last_batch():
+    """Read the cached name of the last proven batch directory, returns (name, end height) or None if the cache is missing or malformed."""
+    try:
+        name = LAST_HEIGHT_FILE.read_text().strip()
+    except OSError:
+        return None
+
+    m = BATCH_DIR_PATTERN.fullmatch(name)
+    if not m:
+        return None
+    return name, int(m.group(1))
+
+
+def read_last_height():
+    """Read the cached ending height of the last proven batch, None if the cache is missing or its proof is gone."""
+    last_batch = read_last_batch()
+    if last_batch is None:
+        return None
+
+    # The batch directory may have been removed since the cache was written
+    name, height = last_batch
+    if not os.path.exists(PROOF_DIR / name / "proof.json"):
+        return None
+    return height
+
+
+def save_last_height(batch_name):
+    """Record the last proven batch directory, so that the next run can start from its ending height without scanning all proof directories."""
+    # Re-proving an earlier batch must not move the cached height back
+    last_batch = read_last_batch()
+    height = int(BATCH_DIR_PATTERN.fullmatch(batch_name).group(1))
+    if last_batch is not None and last_batch[1] >= height:
+        return
+
+    tmp_file = LAST_HEIGHT_FILE.with_suffix(".tmp")
+    tmp_file.write_text(batch_name)
+    os.replace(tmp_file, LAST_HEIGHT_FILE)
+
+
 def auto_detect_start():
     """Auto-detect the starting height by finding the highest ending height from existing proof directories."""
+    last_height = read_last_height()
+    if last_height is not None:
+        return last_height
+
     max_height = 0
-    pattern = re.compile(r"light_\d+_to_(\d+)")
 
     if not PROOF_DIR.exists():
         return max_height
 
-    for proof_dir in PROOF_DIR.iterdir():
-        if proof_dir.is_dir():
-            m = pattern.match(proof_dir.name)
-            if m:
-                # Check if the proof file actually exists
-                proof_file = proof_dir / "proof.json"
-                if proof_file.exists():
-                    end_height = int(m.group(1))
-                    if end_height > max_height:
-                        max_height = end_height
+    with os.scandir(PROOF_DIR) as entries:
+        for entry in entries:
+            # Match the name first, is_dir() is answered from the directory
+            # listing itself and only stats symlinks
+            m = BATCH_DIR_PATTERN.match(entry.name)
+            if not m or not entry.is_dir():
+                continue
+            end_height = int(m.group(1))
+            # Check if the proof file actually exists, only when it matters
+            if end_height > max_height and os.path.exists(
+                os.path.join(entry.path, "proof.json")
+            ):
+                max_height = end_height
     return max_height
 
 
+def positive_int(value):
+    """Argparse type for options that must be a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run single-threaded client script")
     parser.add_argument(
@@ -461,6 +791,17 @@ if __name__ == "__main__":
     parser.add_argument(
         "--step", type=int, default=10, help="Step size for block processing"
     )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of worker processes generating batch data ahead of the prover",
+    )
+    parser.add_argument(
+        "--cpus-per-worker",
+        type=positive_int,
+        help="Pin each worker to this many reserved CPUs, the prover runs on the rest (default: no pinning)",
+    )
     parser.add_argument("--verbose", action="store_true", help="Verbose logging")
 
     args = parser.parse_args()
@@ -473,4 +814,4 @@ if __name__ == "__main__":
         start = auto_detect_start()
         logger.info(f"Auto-detected start: {start}")
 
-    main(start, args.blocks, args.step)
+    asyncio.run(main(start, args.blocks, args.step, args.jobs, args.cpus_per_worker))